@@ -1,13 +1,25 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response
+from flask.helpers import get_debug_flag
 from flask_cors import CORS
+from werkzeug.serving import is_running_from_reloader
+import click
 import re
 import random
+import difflib
 import nltk
 from nltk.corpus import wordnet
 from nltk.tokenize import sent_tokenize, word_tokenize
 from nltk.tag import pos_tag
 from nltk.chunk import ne_chunk
+import os
 import string
+import hashlib
+import caching
+import parallel
+import prefetch
+import profiling
+import singleflight
+import tokenization
 
 app = Flask(__name__, static_folder='static', static_url_path='')
 CORS(app)
@@ -38,9 +50,36 @@ try:
 except LookupError:
     nltk.download('stopwords', quiet=True)
 
-class TextHumanizer:
+# Tokenizer used by TextHumanizer: 'fast' (regex) or 'nltk' (Punkt/Treebank)
+TOKENIZER = os.environ.get('HUMANIZE_TOKENIZER', 'fast')
+
+class TextAnalysis:
+    """Sentence analyses and validated replacements shared between variants of one text"""
     def __init__(self):
-        self.synonym_cache = {}
+        self.sentences = {}
+        self.candidates = {}
+
+class TextHumanizer:
+    def __init__(self, tokenizer=TOKENIZER, cache=None, pool=None):
+        # Synonyms, meaning verdicts and sentence analyses; may be shared across processes
+        self.cache = cache if cache is not None else caching.build_cache()
+        # Sentence analyses grow with the input rather than the vocabulary, so
+        # they get their own byte-bounded local tier
+        self.sentence_cache = caching.sentence_cache(self.cache)
+        
+        # Optional parallel.SentencePool for the sentence-local stages
+        self.pool = pool
+        
+        # Fast regex tokenizers by default; 'nltk' falls back to Punkt/Treebank
+        self.tokenizer = tokenizer
+        if tokenizer == 'nltk':
+            self.sent_tokenize = sent_tokenize
+            self.word_tokenize = word_tokenize
+        elif tokenizer == 'fast':
+            self.sent_tokenize = tokenization.sent_tokenize
+            self.word_tokenize = tokenization.word_tokenize
+        else:
+            raise ValueError(f"Unknown tokenizer {tokenizer!r} (HUMANIZE_TOKENIZER): use 'fast' or 'nltk'")
         
         # Research-specific academic vocabulary database
         self.research_vocabulary = {
@@ -134,6 +173,10 @@ class TextHumanizer:
             'conclusion': ['In conclusion', 'To summarize', 'In summary', 'Overall', 'In essence', 'To conclude'],
         }
         
+        # Function words that paraphrasing never replaces
+        self.skip_words = {'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 
+                          'have', 'has', 'had', 'this', 'that', 'these', 'those', 'of', 'in', 'on', 'at', 'to', 'for'}
+        
         # Research-specific terminology that should be preserved
         self.preserve_terms = {
             'hypothesis', 'hypotheses', 'methodology', 'methodological', 'quantitative', 'qualitative',
@@ -146,6 +189,24 @@ class TextHumanizer:
             'introduction', 'methodology', 'results', 'discussion', 'conclusion', 'appendix'
         }
         
+    def _synsets(self, word, pos=None):
+        """WordNet lookup, counted when the request is being profiled"""
+        profile = profiling.current_profile()
+        if profile is not None:
+            profile.count('synsets')
+        return wordnet.synsets(word, pos=pos)
+    
+    def _stage(self, name, func, text, **kwargs):
+        """Run one pipeline stage, recording it when the request is being profiled"""
+        profile = profiling.current_profile()
+        if profile is None:
+            return func(text, **kwargs)
+        with profile.stage(name):
+            return func(text, **kwargs)
+    
+    def _cache_key(self, kind, *parts):
+        return f"v{caching.CACHE_VERSION}:{kind}:" + '|'.join(parts)
+    
     def get_synonyms(self, word, pos=None, context_words=None):
         """Get research-optimized, context-aware synonyms"""
         word_lower = word.lower()
@@ -158,29 +219,26 @@ class TextHumanizer:
         if word_lower in self.research_vocabulary:
             return self.research_vocabulary[word_lower]
         
-        cache_key = f"{word_lower}_{pos if pos else 'any'}"
-        if cache_key in self.synonym_cache:
-            synonyms = self.synonym_cache[cache_key]
-        else:
-            synonyms = set()
-            if pos:
-                pos_map = {'N': wordnet.NOUN, 'V': wordnet.VERB, 'J': wordnet.ADJ, 'R': wordnet.ADV}
-                wordnet_pos = pos_map.get(pos[0], None)
-                if wordnet_pos:
-                    synsets = wordnet.synsets(word, pos=wordnet_pos)
-                else:
-                    synsets = wordnet.synsets(word)
-            else:
-                synsets = wordnet.synsets(word)
-            
+        wordnet_pos = None
+        if pos:
+            pos_map = {'N': wordnet.NOUN, 'V': wordnet.VERB, 'J': wordnet.ADJ, 'R': wordnet.ADV}
+            wordnet_pos = pos_map.get(pos[0], None)
+        
+        # Keyed by WordNet POS: tags such as NN and NNS give the same synonyms
+        cache_key = self._cache_key('syn', word_lower, wordnet_pos or 'any')
+        synonyms = self.cache.get(cache_key)
+        if synonyms is None:
+            found = set()
+            synsets = self._synsets(word, pos=wordnet_pos)
             for syn in synsets:
                 for lemma in syn.lemmas():
                     synonym = lemma.name().replace('_', ' ')
                     if synonym.lower() != word_lower and len(synonym.split()) == 1:
-                        synonyms.add(synonym)
+                        found.add(synonym)
             
-            self.synonym_cache[cache_key] = list(synonyms)
-            synonyms = list(synonyms)
+            # Sorted so every process caches and picks from the same list
+            synonyms = sorted(found)
+            self.cache.set(cache_key, synonyms)
         
         # Filter for academic/research tone
         informal_words = {'guy', 'stuff', 'thing', 'gonna', 'wanna', 'gotta', 'kinda', 'sorta', 
@@ -249,108 +307,177 @@ class TextHumanizer:
     
     def preserve_meaning(self, original_word, synonym, context):
         """Ensure synonym maintains the same meaning in context - stricter validation"""
+        # If words are too similar, they might be the same word
+        if original_word.lower() == synonym.lower():
+            return True
+        
+        cache_key = self._cache_key('meaning', original_word.lower(), synonym.lower())
+        verdict = self.cache.get(cache_key)
+        if verdict is not None:
+            return verdict
+        
         try:
-            # If words are too similar, they might be the same word
-            if original_word.lower() == synonym.lower():
-                return True
-            
-            # Check if synonym is too different
-            original_synsets = set()
-            for syn in wordnet.synsets(original_word):
-                original_synsets.add(syn.name())
-            
-            if not original_synsets:
-                # If original word has no synsets, be conservative
-                return False
-            
-            synonym_synsets = set()
-            for syn in wordnet.synsets(synonym):
-                synonym_synsets.add(syn.name())
-            
-            if not synonym_synsets:
-                # If synonym has no synsets, reject it
-                return False
-            
-            # If they share synsets, meaning is definitely preserved
-            if original_synsets.intersection(synonym_synsets):
-                return True
-            
-            # Check path similarity - require higher threshold for meaning preservation
-            original_syn = wordnet.synsets(original_word)
-            synonym_syn = wordnet.synsets(synonym)
-            if original_syn and synonym_syn:
-                # Try multiple synsets to find best match
-                max_similarity = 0
-                for orig_syn in original_syn[:3]:  # Check first 3 synsets
-                    for syn_syn in synonym_syn[:3]:
-                        similarity = orig_syn.path_similarity(syn_syn)
-                        if similarity and similarity > max_similarity:
-                            max_similarity = similarity
-                
-                # Require at least 40% similarity for meaning preservation
-                return max_similarity > 0.4
-            
-            # If we can't verify similarity, reject to preserve meaning
+            verdict = self.check_meaning(original_word, synonym)
+        except Exception:
+            # If error occurs, be conservative and reject (without caching the verdict)
+            return False
+        self.cache.set(cache_key, verdict)
+        return verdict
+    
+    def check_meaning(self, original_word, synonym):
+        """Compare the WordNet senses of two different words"""
+        # Check if synonym is too different
+        original_syn = self._synsets(original_word)
+        original_synsets = {syn.name() for syn in original_syn}
+        
+        if not original_synsets:
+            # If original word has no synsets, be conservative
+            return False
+        
+        synonym_syn = self._synsets(synonym)
+        synonym_synsets = {syn.name() for syn in synonym_syn}
+        
+        if not synonym_synsets:
+            # If synonym has no synsets, reject it
             return False
-        except Exception as e:
-            # If error occurs, be conservative and reject
+        
+        # If they share synsets, meaning is definitely preserved
+        if original_synsets.intersection(synonym_synsets):
+            return True
+        
+        # Check path similarity - require higher threshold for meaning preservation
+        profile = profiling.current_profile()
+        if profile is not None:
+            profile.wordnet_calls['path_similarity'] += min(len(original_syn), 3) * min(len(synonym_syn), 3)
+        # Try multiple synsets to find best match
+        max_similarity = 0
+        for orig_syn in original_syn[:3]:  # Check first 3 synsets
+            for syn_syn in synonym_syn[:3]:
+                similarity = orig_syn.path_similarity(syn_syn)
+                if similarity and similarity > max_similarity:
+                    max_similarity = similarity
+        
+        # Require at least 40% similarity for meaning preservation
+        return max_similarity > 0.4
+    
+    def is_replaceable(self, word, tag):
+        """Whether paraphrasing may replace a word with this POS tag"""
+        if word in string.punctuation:
             return False
+        # Professional synonym replacement with strict meaning preservation
+        return tag.startswith(('NN', 'VB', 'JJ', 'RB')) and word.lower() not in self.skip_words
+    
+    def warm_word(self, word, tag):
+        """Fill the synonym and meaning-validation caches for one word"""
+        for syn in self.get_synonyms(word, tag):
+            self.preserve_meaning(word, syn, None)
+    
+    def replacement_candidates(self, word, tag, prev_word=None, next_word=None, prev_tag=None):
+        """Synonyms of word that preserve its meaning and agree grammatically"""
+        word_lower = word.lower()
+        synonyms = self.get_synonyms(word, tag)
+        valid_synonyms = []
+        for syn in synonyms:
+            # Strict meaning preservation check
+            if self.preserve_meaning(word, syn, None):
+                # Check grammar agreement with more context
+                checked_syn = self.check_grammar_agreement(syn, tag, prev_word, next_word, prev_tag)
+                # Only use if it's different and valid
+                if checked_syn and checked_syn.lower() != word_lower:
+                    valid_synonyms.append(checked_syn)
+        return valid_synonyms
     
-    def paraphrase_sentence(self, sentence):
-        """Professional paraphrasing that preserves meaning and grammar"""
-        words = word_tokenize(sentence)
+    def analyze_sentence(self, sentence, analysis=None):
+        """Tokenize and tag a sentence and find validated replacements for each word.
+        
+        Returns a list of (word, valid_synonyms, replace_chance) tuples. Results
+        are cached, and also shared through the analysis when one is given.
+        """
+        if analysis is not None and sentence in analysis.sentences:
+            return analysis.sentences[sentence]
+        
+        # Analyses only depend on the sentence (and tokenizer), so they are shared
+        # through the cache across requests and processes
+        digest = hashlib.sha1(sentence.encode('utf-8')).hexdigest()
+        cache_key = self._cache_key('sentence', self.tokenizer, digest)
+        tokens = self.sentence_cache.get(cache_key)
+        if tokens is None:
+            tokens = self._analyze_tokens(sentence, analysis)
+            self.sentence_cache.set(cache_key, tokens)
+        
+        if analysis is not None:
+            analysis.sentences[sentence] = tokens
+        return tokens
+    
+    def _analyze_tokens(self, sentence, analysis):
+        words = self.word_tokenize(sentence)
         tagged = pos_tag(words)
         
-        new_words = []
-        skip_words = {'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 
-                     'have', 'has', 'had', 'this', 'that', 'these', 'those', 'of', 'in', 'on', 'at', 'to', 'for'}
-        
+        tokens = []
         for i, (word, tag) in enumerate(tagged):
-            # Skip punctuation
-            if word in string.punctuation:
-                new_words.append(word)
+            # Skip punctuation, function words and other parts of speech
+            if not self.is_replaceable(word, tag):
+                tokens.append((word, None, 0))
                 continue
             
-            word_lower = word.lower()
             prev_word = tagged[i-1][0] if i > 0 else None
             prev_tag = tagged[i-1][1] if i > 0 else None
             next_word = tagged[i+1][0] if i < len(tagged) - 1 else None
             
-            # Get context for meaning preservation
-            context = [w for w, t in tagged[max(0, i-2):min(len(tagged), i+3)] if w not in string.punctuation]
+            # The validators only look at these neighbours, so the key covers
+            # every input that can change the result
+            key = (word, tag, prev_word, next_word, prev_tag)
+            if analysis is not None and key in analysis.candidates:
+                valid_synonyms = analysis.candidates[key]
+            else:
+                valid_synonyms = self.replacement_candidates(word, tag, prev_word, next_word, prev_tag)
+                if analysis is not None:
+                    analysis.candidates[key] = valid_synonyms
             
-            # Professional synonym replacement with strict meaning preservation
-            if tag.startswith(('NN', 'VB', 'JJ', 'RB')) and word_lower not in skip_words:
-                synonyms = self.get_synonyms(word, tag, context)
-                if synonyms:
-                    # Filter synonyms that preserve meaning - stricter now
-                    valid_synonyms = []
-                    for syn in synonyms:
-                        # Strict meaning preservation check
-                        if self.preserve_meaning(word, syn, context):
-                            # Check grammar agreement with more context
-                            checked_syn = self.check_grammar_agreement(syn, tag, prev_word, next_word, prev_tag)
-                            # Only use if it's different and valid
-                            if checked_syn and checked_syn.lower() != word_lower:
-                                valid_synonyms.append(checked_syn)
-                    
-                    if valid_synonyms:
-                        # Conservative replacement rate to preserve meaning and grammar
-                        if tag.startswith(('NN', 'VB')):
-                            replace_chance = 0.45  # Slightly reduced
-                        else:
-                            replace_chance = 0.35  # Reduced for adjectives/adverbs
-                        
-                        if random.random() < replace_chance:
-                            new_words.append(random.choice(valid_synonyms))
-                        else:
-                            new_words.append(word)
-                    else:
-                        # No valid synonyms found - keep original
-                        new_words.append(word)
-                else:
-                    new_words.append(word)
+            # Conservative replacement rate to preserve meaning and grammar
+            if tag.startswith(('NN', 'VB')):
+                replace_chance = 0.45  # Slightly reduced
             else:
+                replace_chance = 0.35  # Reduced for adjectives/adverbs
+            tokens.append((word, valid_synonyms, replace_chance))
+        
+        return tokens
+    
+    def adapt_analysis(self, tokens, sentence):
+        """Carry the analysis of a sentence over to a variation of it
+        
+        Words the variation left in place keep their replacements; words it
+        inserted are kept as they are.
+        """
+        words = self.word_tokenize(sentence)
+        original_words = [token[0] for token in tokens]
+        if words == original_words:
+            return tokens
+        adapted = []
+        matcher = difflib.SequenceMatcher(None, original_words, words, autojunk=False)
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == 'equal':
+                adapted.extend(tokens[i1:i2])
+            else:
+                adapted.extend((word, None, 0) for word in words[j1:j2])
+        return adapted
+    
+    def paraphrase_sentence(self, sentence, rng=random, analysis=None, original=None):
+        """Professional paraphrasing that preserves meaning and grammar
+        
+        original is the sentence before add_human_variations; its analysis is
+        reused so variants of a text only analyse each sentence once.
+        """
+        if original is None or original == sentence:
+            tokens = self.analyze_sentence(sentence, analysis)
+        else:
+            tokens = self.adapt_analysis(self.analyze_sentence(original, analysis), sentence)
+        new_words = []
+        for word, valid_synonyms, replace_chance in tokens:
+            if valid_synonyms and rng.random() < replace_chance:
+                new_words.append(rng.choice(valid_synonyms))
+            else:
+                # No valid synonyms found or not chosen - keep original
                 new_words.append(word)
         
         result = ' '.join(new_words)
@@ -359,9 +486,50 @@ class TextHumanizer:
         result = re.sub(r'([,.!?;:])([^\s])', r'\1 \2', result)
         return result
     
-    def restructure_sentences(self, text):
+    def _sentence_seeds(self, rng, count):
+        """One seed per sentence, so results do not depend on how sentences are batched"""
+        base = rng.getrandbits(64)
+        return [f'{base}:{i}' for i in range(count)]
+    
+    def _map_sentences(self, method, calls, keys=None, **local_kwargs):
+        """Call a per-sentence method for each args tuple, on the worker pool for large inputs
+        
+        Calls with the same key always run on the same worker. local_kwargs only
+        reach the in-process path; worker processes have their own caches.
+        """
+        if self.pool is not None and self.pool.should_fan_out(len(calls)) and profiling.current_profile() is None:
+            try:
+                return self.pool.map(method, calls, keys)
+            except parallel.BrokenProcessPool:
+                # A worker died mid-request; the pool has been replaced, so
+                # finish this call in-process
+                pass
+        func = getattr(self, method)
+        return [func(*args, **local_kwargs) for args in calls]
+    
+    def paraphrase_one(self, sentence, seed, original=None, analysis=None):
+        """Paraphrase a sentence with more than two words using its own seed"""
+        if len(sentence.split()) > 2:
+            return self.paraphrase_sentence(sentence, random.Random(seed), analysis, original)
+        return sentence
+    
+    def paraphrase_text(self, text, rng=random, analysis=None):
+        """Paraphrase every sentence with more than two words"""
+        return self.paraphrase_sentences(self.sent_tokenize(text), rng=rng, analysis=analysis)
+    
+    def paraphrase_sentences(self, sentences, rng=random, analysis=None, originals=None):
+        """Paraphrase a list of sentences, optionally reusing the analyses of their originals"""
+        seeds = self._sentence_seeds(rng, len(sentences))
+        if originals is None:
+            originals = sentences
+        calls = list(zip(sentences, seeds, originals))
+        # Keyed on the original so every variant of a sentence reuses one worker's analysis
+        paraphrased = self._map_sentences('paraphrase_one', calls, keys=originals, analysis=analysis)
+        return ' '.join(paraphrased)
+    
+    def restructure_sentences(self, text, rng=random):
         """Professional sentence restructuring that maintains clarity and grammar"""
-        sentences = sent_tokenize(text)
+        sentences = self.sent_tokenize(text)
         if len(sentences) <= 1:
             return text
         
@@ -376,20 +544,20 @@ class TextHumanizer:
             word_count = len(words)
             
             # Combine short consecutive sentences (30% chance, reduced for clarity)
-            if word_count < 10 and i < len(sentences) - 1 and random.random() < 0.3:
+            if word_count < 10 and i < len(sentences) - 1 and rng.random() < 0.3:
                 next_sent = sentences[i + 1]
                 next_words = next_sent.split()
                 if len(next_words) < 15:
                     # Professional connectors
                     connectors = [', and', ', while', ', whereas', '. Additionally,', '. Moreover,', '. Furthermore,']
-                    connector = random.choice(connectors)
+                    connector = rng.choice(connectors)
                     combined = f"{sentence.rstrip('.!?')}{connector} {next_sent.strip()}"
                     restructured.append(combined)
                     used_indices.add(i + 1)
                     continue
             
             # Split very long sentences (25% chance, more careful splitting)
-            if word_count > 30 and random.random() < 0.25:
+            if word_count > 30 and rng.random() < 0.25:
                 split_point = word_count // 2
                 # Find natural split point (comma, conjunction, relative pronoun)
                 for j in range(split_point - 5, split_point + 5):
@@ -409,8 +577,8 @@ class TextHumanizer:
                 
                 # Add professional transition
                 professional_connectors = ['Moreover,', 'Additionally,', 'Furthermore,', 'Consequently,']
-                if random.random() < 0.4 and first_part.rstrip('.,'):
-                    second_part = random.choice(professional_connectors) + ' ' + second_part.lower()
+                if rng.random() < 0.4 and first_part.rstrip('.,'):
+                    second_part = rng.choice(professional_connectors) + ' ' + second_part.lower()
                 
                 # Ensure proper punctuation
                 if not first_part.rstrip().endswith(('.', '!', '?')):
@@ -424,19 +592,33 @@ class TextHumanizer:
         
         return ' '.join(restructured)
     
-    def add_human_variations(self, text):
+    def add_human_variations(self, text, rng=random):
         """Replace AI patterns with research-appropriate alternatives"""
+        return self.apply_variations(text, self.choose_variations(rng))
+    
+    def vary_sentences(self, sentences, rng=random):
+        """add_human_variations for a list of sentences, with one set of choices for all of them"""
+        choices = self.choose_variations(rng)
+        return [self.apply_variations(sentence, choices) for sentence in sentences]
+    
+    def apply_variations(self, text, choices):
+        for pattern, replacement in choices:
+            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        return text
+    
+    def choose_variations(self, rng=random):
+        """Pick the (pattern, replacement) pairs add_human_variations applies, in order"""
+        choices = []
+        
         # Apply research-specific pattern replacements first
         for pattern, replacements in self.research_patterns.items():
-            if random.random() < 0.9:  # 90% chance for research patterns
-                replacement = random.choice(replacements)
-                text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+            if rng.random() < 0.9:  # 90% chance for research patterns
+                choices.append((pattern, rng.choice(replacements)))
         
         # Apply general AI pattern replacements
         for pattern, replacements in self.ai_patterns.items():
-            if random.random() < 0.85:  # 85% chance to replace AI patterns
-                replacement = random.choice(replacements)
-                text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+            if rng.random() < 0.85:  # 85% chance to replace AI patterns
+                choices.append((pattern, rng.choice(replacements)))
         
         # Additional research-specific replacements
         research_replacements = {
@@ -456,47 +638,48 @@ class TextHumanizer:
         }
         
         for pattern, replacements in research_replacements.items():
-            if random.random() < 0.75:
-                replacement = random.choice(replacements)
-                text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+            if rng.random() < 0.75:
+                choices.append((pattern, rng.choice(replacements)))
         
-        return text
+        return choices
     
-    def vary_punctuation(self, text):
+    def vary_punctuation(self, text, rng=random):
         """Add natural human punctuation variations"""
-        sentences = sent_tokenize(text)
-        result = []
-        
-        for i, sentence in enumerate(sentences):
-            words = sentence.split()
-            word_count = len(words)
-            
-            # Add parenthetical comments (25% chance for longer sentences)
-            if random.random() < 0.25 and word_count > 8:
-                insert_pos = random.randint(max(2, word_count // 3), min(word_count - 2, 2 * word_count // 3))
-                comments = ['(as noted)', '(indeed)', '(clearly)', '(obviously)', '(naturally)', '(of course)']
-                if random.random() < 0.3:
-                    words.insert(insert_pos, random.choice(comments))
-                    sentence = ' '.join(words)
-            
-            # Use em dashes for emphasis (15% chance)
-            if random.random() < 0.15 and word_count > 6:
-                # Replace a comma with em dash
-                sentence = sentence.replace(', ', ' — ', 1)
-            
-            # Vary sentence endings (occasionally use exclamation for emphasis in research context)
-            if random.random() < 0.05 and word_count > 5:
-                # Very rarely use exclamation in academic writing
-                if sentence.endswith('.'):
-                    sentence = sentence[:-1] + '!'
-            
-            result.append(sentence)
-        
+        sentences = self.sent_tokenize(text)
+        seeds = self._sentence_seeds(rng, len(sentences))
+        result = self._map_sentences('vary_sentence_punctuation', list(zip(sentences, seeds)))
         return ' '.join(result)
     
-    def add_natural_flow(self, text):
+    def vary_sentence_punctuation(self, sentence, seed):
+        """Punctuation variations for one sentence using its own seed"""
+        rng = random.Random(seed)
+        words = sentence.split()
+        word_count = len(words)
+        
+        # Add parenthetical comments (25% chance for longer sentences)
+        if rng.random() < 0.25 and word_count > 8:
+            insert_pos = rng.randint(max(2, word_count // 3), min(word_count - 2, 2 * word_count // 3))
+            comments = ['(as noted)', '(indeed)', '(clearly)', '(obviously)', '(naturally)', '(of course)']
+            if rng.random() < 0.3:
+                words.insert(insert_pos, rng.choice(comments))
+                sentence = ' '.join(words)
+        
+        # Use em dashes for emphasis (15% chance)
+        if rng.random() < 0.15 and word_count > 6:
+            # Replace a comma with em dash
+            sentence = sentence.replace(', ', ' — ', 1)
+        
+        # Vary sentence endings (occasionally use exclamation for emphasis in research context)
+        if rng.random() < 0.05 and word_count > 5:
+            # Very rarely use exclamation in academic writing
+            if sentence.endswith('.'):
+                sentence = sentence[:-1] + '!'
+        
+        return sentence
+    
+    def add_natural_flow(self, text, rng=random):
         """Add academic writing flow with research-appropriate transitions"""
-        sentences = sent_tokenize(text)
+        sentences = self.sent_tokenize(text)
         if len(sentences) < 2:
             return text
         
@@ -507,7 +690,7 @@ class TextHumanizer:
             curr_sent = sentences[i]
             
             # Add academic transitions between sentences (35% chance)
-            if random.random() < 0.35:
+            if rng.random() < 0.35:
                 # Check if sentence already starts with a transition
                 first_word = curr_sent.split()[0].lower() if curr_sent.split() else ''
                 existing_transitions = ['however', 'furthermore', 'moreover', 'additionally', 'nevertheless', 
@@ -518,16 +701,16 @@ class TextHumanizer:
                     # Add academic transitions based on context
                     if any(word in prev_sent for word in ['however', 'although', 'despite', 'whereas']):
                         # Contrast transition
-                        transition = random.choice(self.academic_transitions['contrast'])
+                        transition = rng.choice(self.academic_transitions['contrast'])
                     elif any(word in prev_sent for word in ['because', 'due to', 'as a result', 'therefore']):
                         # Cause transition
-                        transition = random.choice(self.academic_transitions['cause'])
-                    elif random.random() < 0.4:
+                        transition = rng.choice(self.academic_transitions['cause'])
+                    elif rng.random() < 0.4:
                         # Emphasis transition
-                        transition = random.choice(self.academic_transitions['emphasis'])
+                        transition = rng.choice(self.academic_transitions['emphasis'])
                     else:
                         # Addition transition
-                        transition = random.choice(self.academic_transitions['addition'])
+                        transition = rng.choice(self.academic_transitions['addition'])
                     
                     # Add transition with proper capitalization
                     if curr_sent and curr_sent[0].isupper():
@@ -539,9 +722,9 @@ class TextHumanizer:
         
         return ' '.join(result)
     
-    def vary_sentence_length(self, text):
+    def vary_sentence_length(self, text, rng=random):
         """Ensure natural variation in sentence length"""
-        sentences = sent_tokenize(text)
+        sentences = self.sent_tokenize(text)
         if len(sentences) < 3:
             return text
         
@@ -555,12 +738,12 @@ class TextHumanizer:
             for i, sentence in enumerate(sentences):
                 words = sentence.split()
                 # Occasionally add a short interjection or fragment
-                if random.random() < 0.15 and len(words) > 8:
+                if rng.random() < 0.15 and len(words) > 8:
                     short_additions = ['This is significant.', 'This matters.', 'This is key.', 
                                      'This stands out.', 'This is crucial.']
                     result.append(sentence)
                     if i < len(sentences) - 1:  # Don't add at the end
-                        result.append(random.choice(short_additions))
+                        result.append(rng.choice(short_additions))
                 else:
                     result.append(sentence)
             return ' '.join(result)
@@ -603,30 +786,12 @@ class TextHumanizer:
         return text.strip()
     
     def validate_grammar(self, text):
-        """Additional grammar validation pass"""
-        sentences = sent_tokenize(text)
-        corrected_sentences = []
+        """Additional grammar validation pass
         
-        for sentence in sentences:
-            words = word_tokenize(sentence)
-            tagged = pos_tag(words)
-            
-            # Check for basic grammar issues
-            for i, (word, tag) in enumerate(tagged):
-                # Check for subject-verb agreement issues
-                if i > 0 and tag.startswith('VB'):
-                    prev_word = tagged[i-1][0].lower()
-                    # Basic checks
-                    if prev_word in ['he', 'she', 'it', 'this', 'that'] and word in ['are', 'were', 'have', 'do']:
-                        # Might need singular form, but be careful
-                        pass  # Skip automatic correction to avoid errors
-                    elif prev_word in ['they', 'we', 'you', 'these', 'those'] and word in ['is', 'was', 'has', 'does']:
-                        # Might need plural form, but be careful
-                        pass  # Skip automatic correction to avoid errors
-            
-            corrected_sentences.append(sentence)
-        
-        return ' '.join(corrected_sentences)
+        The subject-verb agreement checks never changed a sentence, so the pass
+        no longer tags anything; it only rejoins the sentences.
+        """
+        return ' '.join(self.sent_tokenize(text))
     
     def ensure_professional_tone(self, text):
         """Ensure text maintains research/academic publication-ready tone"""
@@ -753,57 +918,61 @@ class TextHumanizer:
         
         return text
     
-    def humanize_text(self, text):
-        """Advanced research-ready humanization with Overleaf-quality output"""
+    def humanize_text(self, text, seed=None, analysis=None):
+        """Advanced research-ready humanization with Overleaf-quality output
+        
+        A seed makes the output reproducible; without one the module-level
+        random state is used. An analysis shares tokenization, tagging and
+        synonym validation with other calls on the same text.
+        """
         if not text or not text.strip():
             return text
         
+        rng = random.Random(seed) if seed is not None else random
+        
         # Multi-pass research optimization
         # Step 1: Research structure enhancement
-        text = self.enhance_research_structure(text)
+        text = self._stage('enhance_research_structure', self.enhance_research_structure, text)
         
-        # Step 2: Replace AI patterns with research-appropriate alternatives
-        text = self.add_human_variations(text)
+        # Step 2: Replace AI patterns with research-appropriate alternatives.
+        # Applied sentence by sentence so step 3 can reuse the analysis of the
+        # unvaried sentences, which is the same for every variant.
+        sentences = self.sent_tokenize(text)
+        varied = self._stage('add_human_variations', self.vary_sentences, sentences, rng=rng)
         
         # Step 3: Research-optimized paraphrasing with meaning preservation
-        sentences = sent_tokenize(text)
-        paraphrased = []
-        for sentence in sentences:
-            if len(sentence.split()) > 2:
-                paraphrased.append(self.paraphrase_sentence(sentence))
-            else:
-                paraphrased.append(sentence)
-        text = ' '.join(paraphrased)
+        text = self._stage('paraphrase_text', self.paraphrase_sentences, varied, rng=rng,
+                           analysis=analysis, originals=sentences)
         
         # Step 4: Apply research-specific optimizations
-        text = self.apply_research_optimizations(text)
+        text = self._stage('apply_research_optimizations', self.apply_research_optimizations, text)
         
         # Step 5: Professional sentence restructuring
-        text = self.restructure_sentences(text)
+        text = self._stage('restructure_sentences', self.restructure_sentences, text, rng=rng)
         
         # Step 6: Add academic writing flow
-        text = self.add_natural_flow(text)
+        text = self._stage('add_natural_flow', self.add_natural_flow, text, rng=rng)
         
         # Step 7: Vary sentence lengths (subtle for research)
-        text = self.vary_sentence_length(text)
+        text = self._stage('vary_sentence_length', self.vary_sentence_length, text, rng=rng)
         
         # Step 8: Professional punctuation variation
-        text = self.vary_punctuation(text)
+        text = self._stage('vary_punctuation', self.vary_punctuation, text, rng=rng)
         
         # Step 9: Ensure publication-ready professional tone
-        text = self.ensure_professional_tone(text)
+        text = self._stage('ensure_professional_tone', self.ensure_professional_tone, text)
         
         # Step 10: Fix grammar errors
-        text = self.fix_grammar_errors(text)
+        text = self._stage('fix_grammar_errors', self.fix_grammar_errors, text)
         
         # Step 11: Additional grammar validation
-        text = self.validate_grammar(text)
+        text = self._stage('validate_grammar', self.validate_grammar, text)
         
         # Step 12: Final research optimization pass
-        text = self.apply_research_optimizations(text)
+        text = self._stage('apply_research_optimizations_final', self.apply_research_optimizations, text)
         
         # Step 13: Final grammar check and cleanup
-        text = self.fix_grammar_errors(text)
+        text = self._stage('fix_grammar_errors_final', self.fix_grammar_errors, text)
         
         # Final cleanup and capitalization
         text = text.strip()
@@ -812,7 +981,7 @@ class TextHumanizer:
             text = text[0].upper() + text[1:] if len(text) > 1 else text.upper()
             
             # Ensure all sentences start with capital letters
-            sentences = sent_tokenize(text)
+            sentences = self.sent_tokenize(text)
             capitalized_sentences = []
             for sentence in sentences:
                 sentence = sentence.strip()
@@ -823,28 +992,167 @@ class TextHumanizer:
             text = ' '.join(capitalized_sentences)
         
         return text
+    
+    def humanize_variants(self, text, count, seed=None):
+        """Generate count different humanizations that share one text analysis"""
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        analysis = TextAnalysis()
+        return [self.humanize_text(text, seed=seed + i, analysis=analysis) for i in range(count)]
 
 humanizer = TextHumanizer()
 
+def starts_reloader():
+    """Whether this process is about to hand serving over to a Werkzeug reloader child"""
+    if __name__ == '__main__':
+        # `python app.py` runs app.run(debug=True), which reloads
+        return True
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        # `flask --app app run`: the app is imported while the command's options are parsed
+        ctx = click.get_current_context(silent=True)
+        if ctx is None or ctx.info_name != 'run':
+            return False
+        reload = ctx.params.get('reload')
+        return get_debug_flag() if reload is None else reload
+    return False
+
+def serves_requests():
+    """False in sentence workers and in the reloader's file-watching process"""
+    if parallel.in_worker():
+        return False
+    # The reloader's child has WERKZEUG_RUN_MAIN set; its watcher never serves
+    return is_running_from_reloader() or not starts_reloader()
+
+# Sentence batches fan out to pre-started worker processes when HUMANIZE_WORKERS > 0.
+# Started before any other thread so forked workers inherit a quiet process.
+if parallel.WORKERS > 0 and serves_requests():
+    humanizer.pool = parallel.SentencePool(parallel.WORKERS, TextHumanizer)
+
+profile_store = profiling.ProfileStore()
+in_flight = singleflight.SingleFlight()
+
+# Warms the synonym and meaning caches from the word list while no request is running
+warmer = prefetch.VocabularyWarmer(humanizer)
+if prefetch.PREFETCH_ENABLED and prefetch.PREFETCH_WORDLIST and serves_requests():
+    warmer.load_wordlist(prefetch.PREFETCH_WORDLIST)
+    warmer.start()
+
+# Upper bound on the number of variants one request may ask for
+MAX_VARIANTS = 10
+
+def requested_profile_token():
+    """Profiling token sent with the request, if any"""
+    return request.headers.get('X-Profile-Token') or request.args.get('profile')
+
+def run_humanizer(text, variants, seed):
+    """Return a list of humanized versions of text"""
+    if variants > 1:
+        return humanizer.humanize_variants(text, variants, seed=seed)
+    return [humanizer.humanize_text(text, seed=seed)]
+
+class RequestError(ValueError):
+    """Invalid /api/humanize request body (HTTP 400)"""
+
+def parse_humanize_request(data):
+    """Validate a /api/humanize request body and return (text, variants, seed)"""
+    text = data.get('text', '')
+    seed = data.get('seed')
+    variants = data.get('variants', 1)
+    
+    if not text:
+        raise RequestError('No text provided')
+    if type(variants) is not int or not 1 <= variants <= MAX_VARIANTS:
+        raise RequestError(f'variants must be an integer between 1 and {MAX_VARIANTS}')
+    if seed is not None and type(seed) is not int:
+        raise RequestError('seed must be an integer')
+    return text, variants, seed
+
+def process_humanize(data, profile_token=None, coalesce=True):
+    """Handle a /api/humanize request body; returns (response dict, HTTP status)"""
+    try:
+        text, variants, seed = parse_humanize_request(data)
+    except RequestError as e:
+        return {'error': str(e)}, 400
+    return humanize_response(text, variants, seed, profile_token, coalesce)
+
+def humanize_response(text, variants, seed, profile_token=None, coalesce=True):
+    """Humanize a validated request; returns (response dict, HTTP status)
+    
+    Shared by the Flask routes and the asyncio server in asgi.py. Callers that
+    deduplicate requests themselves pass coalesce=False.
+    """
+    response = {'original': text}
+    with warmer.busy():
+        if profiling.is_authorized(profile_token):
+            results, profile = profiling.run_profiled(run_humanizer, text, variants, seed)
+            profile_store.add(profile)
+            response['profile_id'] = profile.id
+        elif coalesce:
+            # Identical concurrent submissions share one computation
+            key = singleflight.request_key(text, variants, seed)
+            results = in_flight.do(key, run_humanizer, text, variants, seed)
+        else:
+            results = run_humanizer(text, variants, seed)
+    
+    response['humanized'] = results[0]
+    if variants > 1:
+        response['variants'] = results
+    response['success'] = True
+    return response, 200
+
 @app.route('/api/humanize', methods=['POST'])
 def humanize():
     try:
-        data = request.get_json()
-        text = data.get('text', '')
-        
-        if not text:
-            return jsonify({'error': 'No text provided'}), 400
-        
-        humanized_text = humanizer.humanize_text(text)
-        
-        return jsonify({
-            'original': text,
-            'humanized': humanized_text,
-            'success': True
-        })
+        response, status = process_humanize(request.get_json(), requested_profile_token())
+        return jsonify(response), status
     except Exception as e:
         return jsonify({'error': str(e), 'success': False}), 500
 
+def profile_admin_denied(token):
+    """(error dict, HTTP status) unless token may read stored profiles, else None"""
+    if not profiling.is_enabled():
+        return {'error': 'Profiling is disabled'}, 404
+    if not profiling.is_authorized(token):
+        return {'error': 'Forbidden'}, 403
+    return None
+
+def profile_admin_error():
+    """Return an error response unless the caller may read stored profiles"""
+    denied = profile_admin_denied(request.headers.get('X-Profile-Token') or request.args.get('token'))
+    if denied:
+        error, status = denied
+        return jsonify(error), status
+    return None
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    error = profile_admin_error()
+    if error:
+        return error
+    return jsonify({'profiles': profile_store.list()})
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    error = profile_admin_error()
+    if error:
+        return error
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify(profile.summary())
+
+@app.route('/api/admin/profiles/<profile_id>/flamegraph', methods=['GET'])
+def download_flamegraph(profile_id):
+    error = profile_admin_error()
+    if error:
+        return error
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return Response(profile.collapsed(), mimetype='text/plain', headers={
+        'Content-Disposition': f'attachment; filename=humanize-{profile_id}.collapsed'
+    })
+
 @app.route('/api/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy'})
@@ -0,0 +1,262 @@
+"""
+Asyncio serving path for the Text Humanizer API.
+
+A plain ASGI application exposing the same /api/humanize, /api/health and
+/api/admin/profiles contract (and static frontend) as the Flask app, for any
+ASGI server:
+
+    uvicorn asgi:app --port 5000
+
+Connections are handled on the event loop, so slow clients and long uploads
+cost no thread. Request bodies are read asynchronously with a size limit, and
+CPU-bound TextHumanizer work runs on a bounded thread pool: at most
+HUMANIZE_ASGI_THREADS requests compute at once, and at most
+HUMANIZE_ASGI_MAX_QUEUED more wait for a slot before new ones get 503.
+Identical concurrent payloads await a single computation without holding
+threads. The Flask routes in app.py remain available unchanged.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import app as humanizer_app
+import profiling
+import singleflight
+
+EXECUTOR_THREADS = int(os.environ.get('HUMANIZE_ASGI_THREADS', str(os.cpu_count() or 4)))
+MAX_QUEUED = int(os.environ.get('HUMANIZE_ASGI_MAX_QUEUED', '1000'))
+MAX_BODY_BYTES = int(os.environ.get('HUMANIZE_MAX_BODY_BYTES', str(5 * 1024 * 1024)))
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'Content-Type, X-Profile-Token'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+]
+
+# /api/admin/profiles, /api/admin/profiles/<id> and /api/admin/profiles/<id>/flamegraph
+PROFILE_PATH_RE = re.compile(r'/api/admin/profiles(?:/([^/]+)(/flamegraph)?)?')
+
+executor = ThreadPoolExecutor(max_workers=EXECUTOR_THREADS, thread_name_prefix='humanize')
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+class Server:
+    """Per-event-loop state: compute slots and in-flight requests"""
+
+    def __init__(self):
+        self.slots = asyncio.Semaphore(EXECUTOR_THREADS)
+        self.waiting = 0
+        self.in_flight = {}
+
+    async def humanize(self, body, profile_token):
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        try:
+            parsed = humanizer_app.parse_humanize_request(data)
+        except humanizer_app.RequestError as e:
+            return {'error': str(e)}, 400
+        except Exception as e:
+            return {'error': str(e), 'success': False}, 500
+        if profiling.is_authorized(profile_token):
+            return await self.compute(parsed, profile_token)
+
+        # Identical requests share one computation, keyed like the Flask
+        # route's; waiters hold no thread
+        key = singleflight.request_key(*parsed)
+        future = self.in_flight.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            # The leader's client went away; this request still needs its result
+            return await self.compute(parsed, None)
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            result = await self.compute(parsed, None)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve it so an exception nobody else awaited is not reported as lost
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[key]
+
+    async def compute(self, parsed, profile_token):
+        if self.slots.locked() and self.waiting >= MAX_QUEUED:
+            return {'error': 'Server is busy, try again later', 'success': False}, 503
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, run_request, parsed, profile_token)
+        finally:
+            self.slots.release()
+
+
+def run_request(parsed, profile_token):
+    """Executor-side request handling, mirroring the Flask route's error handling"""
+    text, variants, seed = parsed
+    try:
+        return humanizer_app.humanize_response(text, variants, seed, profile_token, coalesce=False)
+    except Exception as e:
+        return {'error': str(e), 'success': False}, 500
+
+
+async def read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise PayloadTooLarge()
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def send_response(send, status, body, content_type, extra_headers=()):
+    headers = [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]
+    headers += list(extra_headers) + CORS_HEADERS
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, payload, status=200):
+    # Same key order as Flask's jsonify
+    body = json.dumps(payload, sort_keys=True).encode('utf-8')
+    await send_response(send, status, body, b'application/json')
+
+
+def read_static(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+async def send_static(send, path):
+    relative = path.lstrip('/') or 'index.html'
+    full_path = os.path.normpath(os.path.join(STATIC_DIR, relative))
+    if not full_path.startswith(STATIC_DIR + os.sep) or not os.path.isfile(full_path):
+        await send_json(send, {'error': 'Not found'}, 404)
+        return
+    # Default executor, so static files never queue behind humanize work
+    body = await asyncio.get_running_loop().run_in_executor(None, read_static, full_path)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    await send_response(send, 200, body, content_type.encode())
+
+
+async def send_profile_admin(send, match, token):
+    """The admin routes for stored request profiles, as in app.py"""
+    denied = humanizer_app.profile_admin_denied(token)
+    if denied:
+        await send_json(send, *denied)
+        return
+    profile_id, flamegraph = match.groups()
+    store = humanizer_app.profile_store
+    if profile_id is None:
+        await send_json(send, {'profiles': store.list()})
+        return
+    profile = store.get(profile_id)
+    if profile is None:
+        await send_json(send, {'error': 'Profile not found'}, 404)
+    elif flamegraph:
+        disposition = f'attachment; filename=humanize-{profile_id}.collapsed'
+        await send_response(send, 200, profile.collapsed().encode('utf-8'), b'text/plain; charset=utf-8',
+                            [(b'content-disposition', disposition.encode('latin-1'))])
+    else:
+        await send_json(send, profile.summary())
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False, cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+_servers = {}
+
+
+def get_server():
+    loop = asyncio.get_running_loop()
+    server = _servers.get(loop)
+    if server is None:
+        server = _servers[loop] = Server()
+    return server
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    method = scope['method']
+    path = scope['path']
+    headers = dict(scope.get('headers') or [])
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    profile_match = PROFILE_PATH_RE.fullmatch(path)
+
+    if method == 'OPTIONS':
+        await send_response(send, 200, b'', b'text/plain')
+    elif path == '/api/humanize':
+        if method != 'POST':
+            await send_json(send, {'error': 'Method not allowed'}, 405)
+            return
+        try:
+            body = await read_body(receive)
+        except PayloadTooLarge:
+            await send_json(send, {'error': 'Request body too large', 'success': False}, 413)
+            return
+        if body is None:
+            return  # Client went away before finishing the upload
+        token = headers.get(b'x-profile-token', b'').decode('latin-1') or query.get('profile', [None])[0]
+        payload, status = await get_server().humanize(body, token)
+        await send_json(send, payload, status)
+    elif profile_match:
+        if method != 'GET':
+            await send_json(send, {'error': 'Method not allowed'}, 405)
+            return
+        token = headers.get(b'x-profile-token', b'').decode('latin-1') or query.get('token', [None])[0]
+        await send_profile_admin(send, profile_match, token)
+    elif path == '/api/health':
+        await send_json(send, {'status': 'healthy'})
+    elif method == 'GET' and not path.startswith('/api/'):
+        await send_static(send, path)
+    else:
+        await send_json(send, {'error': 'Not found'}, 404)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('asgi:app', host='127.0.0.1', port=5000)
@@ -0,0 +1,236 @@
+"""
+Checks for the cache backends in caching.py.
+
+LocalRedisServer is a small in-process stand-in for Redis that speaks the
+subset of RESP used by RedisCache (GET, SET, AUTH, SELECT, PING), so the
+shared tier can be exercised without a Redis installation. The checks cover
+Redis round trips and expiry, a server that is down or never answers,
+SQLite round trips, expiry, row cap and corrupt rows, and the byte budget
+of the in-memory tier. Exits non-zero when any check fails.
+
+Examples:
+    python cache_check.py
+    python cache_check.py --verbose
+"""
+import argparse
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+import caching
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            if self.server.silent:
+                continue
+            self.wfile.write(self.server.execute(args))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line.startswith(b'*'):
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+class LocalRedisServer(socketserver.ThreadingTCPServer):
+    """In-memory Redis stand-in on 127.0.0.1; silent=True accepts but never replies"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, silent=False):
+        super().__init__(('127.0.0.1', port), _RespHandler)
+        self.silent = silent
+        self.store = {}
+        self.expiry = {}
+        self.commands = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def execute(self, args):
+        command = args[0].upper()
+        with self.lock:
+            self.commands += 1
+            if command == b'GET':
+                value = self.store.get(args[1])
+                return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+            if command == b'SET':
+                self.store[args[1]] = args[2]
+                self.expiry[args[1]] = int(args[4]) if len(args) > 4 and args[3].upper() == b'EX' else None
+                return b'+OK\r\n'
+            if command in (b'AUTH', b'SELECT', b'PING'):
+                return b'+OK\r\n'
+        return b'-ERR unknown command\r\n'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def check_redis_round_trip():
+    server = LocalRedisServer().start()
+    try:
+        cache = caching.RedisCache('127.0.0.1', server.port, db=1, password='secret')
+        value = {'synonyms': ['examine', 'study'], 'n': 3}
+        cache.set('v1:syn:analyze|v', value)
+        assert cache.get('v1:syn:analyze|v') == value
+        assert cache.get('v1:syn:missing|v', 'default') == 'default'
+        assert b'humanize:v1:syn:analyze|v' in server.store
+
+        # A second process would see the same entries through its own tiered cache
+        tiered = caching.build_cache(f'redis://127.0.0.1:{server.port}/0')
+        assert tiered.get('v1:syn:analyze|v') == value
+        assert tiered.local.get('v1:syn:analyze|v') == value
+
+        # Entries written through build_cache expire; ?ttl= sets the expiry
+        tiered.set('a', 1)
+        assert server.expiry[b'humanize:a'] == caching.CACHE_TTL
+        caching.build_cache(f'redis://127.0.0.1:{server.port}/0?ttl=60').set('b', 1)
+        assert server.expiry[b'humanize:b'] == 60
+        caching.build_cache(f'redis://127.0.0.1:{server.port}/0?ttl=0').set('c', 1)
+        assert server.expiry[b'humanize:c'] is None
+    finally:
+        server.stop()
+
+
+def check_redis_restart():
+    port = _free_port()
+    server = LocalRedisServer(port).start()
+    cache = caching.RedisCache('127.0.0.1', port)
+    cache.set('key', 1)
+    server.stop()
+    server = LocalRedisServer(port).start()
+    try:
+        # The stale connection is replaced without marking the server down
+        cache.set('key', 2)
+        assert cache.get('key') == 2
+        assert cache.available()
+    finally:
+        server.stop()
+
+
+def check_redis_down():
+    cache = caching.TieredCache(caching.MemoryCache(), caching.RedisCache('127.0.0.1', _free_port()))
+    cache.set('key', 'value')
+    assert cache.get('key') == 'value'
+    assert cache.get('other', 'default') == 'default'
+    assert not cache.shared.available()
+
+
+def check_redis_blackholed():
+    server = LocalRedisServer(silent=True).start()
+    try:
+        cache = caching.RedisCache('127.0.0.1', server.port, timeout=0.2, retry_after=60)
+        start = time.perf_counter()
+        results = [cache.get(f'key{i}', 'miss') for i in range(200)]
+        elapsed = time.perf_counter() - start
+        assert results == ['miss'] * 200
+        # Only the first lookup waits for the timeout; the rest skip the shared tier
+        assert elapsed < 1.0, f'{elapsed:.2f}s for 200 lookups'
+
+        cache.down_until = 0.0
+        server.silent = False
+        assert cache.get('key0', 'miss') == 'miss' and cache.available()
+    finally:
+        server.stop()
+
+
+def check_sqlite():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache.db')
+        cache = caching.build_cache(f'sqlite://{path}')
+        cache.set('key', ['a', 'b'])
+        assert caching.SQLiteCache(path).get('key') == ['a', 'b']
+
+        shared = caching.SQLiteCache(path)
+        shared._connection().execute("INSERT OR REPLACE INTO entries VALUES ('bad', '{not json', NULL)")
+        assert shared.get('bad', 'miss') == 'miss'
+        shared.set('bad', True)
+        assert shared.get('bad') is True
+
+        expiring = caching.SQLiteCache(path, ttl=1)
+        expiring.set('short', 1)
+        expiring._connection().execute("UPDATE entries SET expires = ? WHERE key = 'short'", (time.time() - 1,))
+        assert expiring.get('short', 'miss') == 'miss'
+
+        capped = caching.SQLiteCache(os.path.join(tmp, 'capped.db'), max_rows=50, prune_every=10)
+        for i in range(200):
+            capped.set(f'key{i}', i)
+        count = capped._connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        assert count <= 50 + 10, count
+        assert capped.get('key199') == 199 and capped.get('key0', 'miss') == 'miss'
+
+        url_cache = caching.build_cache(f'sqlite://{path}?ttl=0&max_rows=7')
+        assert url_cache.shared.ttl == 0 and url_cache.shared.max_rows == 7
+
+
+def check_sentence_budget():
+    cache = caching.sentence_cache(caching.MemoryCache(), max_bytes=10000)
+    analysis = [['word', ['synonym'] * 5, 0.45]] * 10
+    for i in range(1000):
+        cache.set(f'sentence{i}', analysis)
+    assert cache.bytes <= 10000 and len(cache) < 1000
+    assert cache.get('sentence999') == analysis and cache.get('sentence0') is None
+
+    # The shared tier is reused behind the budgeted local one
+    tiered = caching.TieredCache(caching.MemoryCache(), caching.MemoryCache())
+    assert caching.sentence_cache(tiered).shared is tiered.shared
+
+
+CHECKS = [
+    check_redis_round_trip,
+    check_redis_restart,
+    check_redis_down,
+    check_redis_blackholed,
+    check_sqlite,
+    check_sentence_budget,
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the cache backends')
+    parser.add_argument('--verbose', action='store_true', help='Print every check')
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for check in CHECKS:
+        try:
+            check()
+        except Exception as e:
+            failures += 1
+            print(f'FAIL {check.__name__}: {type(e).__name__}: {e}')
+        else:
+            if args.verbose:
+                print(f'ok   {check.__name__}')
+    print(f'{len(CHECKS) - failures}/{len(CHECKS)} cache checks passed')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Cache backends for TextHumanizer.
+
+Synonym lists, meaning-preservation verdicts and sentence analyses are pure
+functions of their inputs, so they can be shared between worker processes,
+nodes and restarts. Every backend offers get(key, default) and set(key, value)
+with JSON-serializable values:
+
+    MemoryCache   per-process LRU dictionary
+    SQLiteCache   local database file shared by the processes on one machine
+    RedisCache    any server speaking the Redis protocol (RESP)
+    TieredCache   looks in a local cache first, then a shared one
+
+build_cache() creates the configured backend from a URL such as
+"memory://", "sqlite:///var/cache/humanizer.db" (or "sqlite://humanizer.db"
+relative to the working directory) or "redis://localhost:6379/0". Shared
+entries expire after HUMANIZE_CACHE_TTL seconds, or ?ttl= in the URL
+(0 keeps them forever); the SQLite table is also capped at ?max_rows= rows.
+Shared backends are always fronted by a MemoryCache.
+
+Synonyms and verdicts are bounded by the vocabulary, but sentence analyses
+grow with every distinct sentence submitted, so sentence_cache() gives them
+their own local tier with a byte budget (HUMANIZE_SENTENCE_CACHE_MB). Backend failures are
+treated as misses so a broken cache never fails a request; after a Redis
+failure the shared tier is skipped for a cool-down period instead of being
+retried on every lookup.
+
+cache_check.py exercises the backends against a local Redis stand-in.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse, unquote
+
+# Bump when the format or meaning of cached values changes
+CACHE_VERSION = 1
+
+CACHE_URL = os.environ.get('HUMANIZE_CACHE_URL', 'memory://')
+CACHE_SIZE = int(os.environ.get('HUMANIZE_CACHE_SIZE', '200000'))
+CACHE_TTL = int(os.environ.get('HUMANIZE_CACHE_TTL', str(7 * 24 * 3600)))
+SQLITE_MAX_ROWS = int(os.environ.get('HUMANIZE_CACHE_MAX_ROWS', '1000000'))
+SENTENCE_CACHE_BYTES = int(float(os.environ.get('HUMANIZE_SENTENCE_CACHE_MB', '64')) * 1024 * 1024)
+
+MISSING = object()
+
+
+class MemoryCache:
+    """Thread-safe LRU cache holding values as Python objects
+
+    With max_bytes, entries are also evicted once their total size, measured
+    as the length of key and JSON-encoded value, exceeds the budget.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self.entries.get(key, MISSING)
+            if value is MISSING:
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(key) + len(json.dumps(value)) if self.max_bytes else 0
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            self.bytes += size - self.sizes.pop(key, 0)
+            if size:
+                self.sizes[key] = size
+            while len(self.entries) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+                old_key, _ = self.entries.popitem(last=False)
+                self.bytes -= self.sizes.pop(old_key, 0)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SQLiteCache:
+    """Key/value table in a local SQLite file, safe to share between processes
+
+    Entries expire ttl seconds after they are written, and the oldest rows
+    are deleted once the table holds more than max_rows. Both are enforced
+    every prune_every writes.
+    """
+
+    def __init__(self, path, ttl=CACHE_TTL, max_rows=SQLITE_MAX_ROWS, prune_every=1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self.writes = 0
+        self.local = threading.local()
+        conn = self._connection()
+        # The unbounded table of earlier versions is replaced
+        conn.execute('DROP TABLE IF EXISTS cache')
+        conn.execute('CREATE TABLE IF NOT EXISTS entries '
+                     '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires)')
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        try:
+            row = self._connection().execute('SELECT value, expires FROM entries WHERE key = ?',
+                                             (key,)).fetchone()
+        except sqlite3.Error:
+            return default
+        if not row or (row[1] is not None and row[1] < time.time()):
+            return default
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            # A corrupt row is a miss; the next set() overwrites it
+            return default
+
+    def set(self, key, value):
+        expires = time.time() + self.ttl if self.ttl else None
+        try:
+            self._connection().execute('INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)',
+                                       (key, json.dumps(value), expires))
+        except sqlite3.Error:
+            return
+        self.writes += 1
+        if self.writes % self.prune_every == 0:
+            self.prune()
+
+    def prune(self):
+        """Delete expired rows, then the oldest rows beyond max_rows"""
+        try:
+            conn = self._connection()
+            conn.execute('DELETE FROM entries WHERE expires < ?', (time.time(),))
+            if self.max_rows:
+                # INSERT OR REPLACE gives a new rowid, so rowid order is write order
+                conn.execute('DELETE FROM entries WHERE rowid <= '
+                             '(SELECT rowid FROM entries ORDER BY rowid DESC LIMIT 1 OFFSET ?)',
+                             (self.max_rows,))
+        except sqlite3.Error:
+            pass
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCache:
+    """Minimal Redis-protocol client (GET/SET) with one connection per thread
+
+    After a failed call the server is considered down for retry_after seconds
+    and every lookup is a miss without touching the network.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, ttl=None,
+                 prefix='humanize:', timeout=1.0, retry_after=30.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.ttl = ttl
+        self.prefix = prefix
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.down_until = 0.0
+        self.local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        conn = (sock, sock.makefile('rb'))
+        self.local.conn = conn
+        if self.password:
+            self._command('AUTH', self.password)
+        if self.db:
+            self._command('SELECT', str(self.db))
+        return conn
+
+    def _close(self):
+        conn = getattr(self.local, 'conn', None)
+        self.local.conn = None
+        if conn:
+            conn[1].close()
+            conn[0].close()
+
+    def _command(self, *args):
+        conn = getattr(self.local, 'conn', None) or self._connect()
+        sock, reader = conn
+        parts = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(f'${len(data)}\r\n'.encode() + data + b'\r\n')
+        sock.sendall(b''.join(parts))
+        return self._read_reply(reader)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise RedisError('connection closed')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            return [self._read_reply(reader) for _ in range(int(rest))]
+        raise RedisError(f'unexpected reply {line!r}')
+
+    def available(self):
+        return time.monotonic() >= self.down_until
+
+    def _call(self, *args):
+        if not self.available():
+            raise RedisError('server unavailable, retrying later')
+        # A stale connection (e.g. after a server restart) gets one retry on a
+        # fresh one; a failed fresh connection marks the server down
+        retry = getattr(self.local, 'conn', None) is not None
+        while True:
+            try:
+                return self._command(*args)
+            except (OSError, RedisError):
+                self._close()
+                if not retry:
+                    self.down_until = time.monotonic() + self.retry_after
+                    raise
+                retry = False
+
+    def get(self, key, default=None):
+        try:
+            data = self._call('GET', self.prefix + key)
+        except (OSError, RedisError):
+            return default
+        if data is None:
+            return default
+        try:
+            return json.loads(data)
+        except ValueError:
+            return default
+
+    def set(self, key, value):
+        args = ['SET', self.prefix + key, json.dumps(value)]
+        if self.ttl:
+            args += ['EX', str(self.ttl)]
+        try:
+            self._call(*args)
+        except (OSError, RedisError):
+            pass
+
+
+class TieredCache:
+    """Local cache in front of a shared one; shared hits are copied locally"""
+
+    def __init__(self, local, shared):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key, default=None):
+        value = self.local.get(key, MISSING)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(key, MISSING)
+        if value is MISSING:
+            return default
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        self.shared.set(key, value)
+
+
+def build_cache(url=CACHE_URL, max_entries=CACHE_SIZE):
+    """Create the cache described by url (memory://, sqlite:///path, redis://host:port/db)
+
+    Shared backends accept ?ttl=<seconds> (0 for no expiry); SQLite also
+    accepts ?max_rows=<n> (0 for no cap).
+    """
+    parsed = urlparse(url or 'memory://')
+    options = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+    ttl = int(options.get('ttl', CACHE_TTL))
+    local = MemoryCache(max_entries)
+    if parsed.scheme in ('', 'memory'):
+        return local
+    if parsed.scheme == 'sqlite':
+        max_rows = int(options.get('max_rows', SQLITE_MAX_ROWS))
+        return TieredCache(local, SQLiteCache(unquote(parsed.netloc + parsed.path), ttl=ttl, max_rows=max_rows))
+    if parsed.scheme == 'redis':
+        db = int(parsed.path.lstrip('/') or 0)
+        return TieredCache(local, RedisCache(parsed.hostname or 'localhost', parsed.port or 6379, db,
+                                             password=unquote(parsed.password) if parsed.password else None,
+                                             ttl=ttl or None))
+    raise ValueError(f'Unsupported cache URL: {url}')
+
+
+def sentence_cache(cache, max_bytes=SENTENCE_CACHE_BYTES):
+    """Byte-bounded local tier for sentence analyses, in front of cache's shared tier if any"""
+    local = MemoryCache(CACHE_SIZE, max_bytes=max_bytes)
+    if isinstance(cache, TieredCache):
+        return TieredCache(local, cache.shared)
+    return local
@@ -0,0 +1,339 @@
+"""
+Local load-testing harness for the Text Humanizer API.
+
+Starts the Flask app in a subprocess (or targets an already running server),
+replays a corpus against /api/humanize and reports throughput, latency
+percentiles, error rate and server RSS over time.
+
+Examples:
+    python loadtest.py --concurrency 8 --duration 60
+    python loadtest.py --rate 5 --duration 120 --corpus papers/
+    python loadtest.py --url http://localhost:5000 --pid 12345 --concurrency 16
+"""
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Used when no corpus is given, so a run is reproducible out of the box
+DEFAULT_CORPUS = [
+    "This paper presents a novel approach to the analysis of large datasets. We used a "
+    "method based on statistical sampling to examine the results. The results show that "
+    "the proposed technique is important for future research.",
+    "In conclusion, our study shows that the model performs well on small samples. However, "
+    "it is important to note that further investigation is required. Furthermore, we found "
+    "that the variables were strongly correlated in the experimental group.",
+    "Due to the fact that the data was collected over a long period, we tested several "
+    "hypotheses. It can be seen that the effect size is big. This suggests that the "
+    "intervention had a significant impact on the outcomes of the participants.",
+    "We propose a framework for evaluating the reliability of empirical findings. In order to "
+    "make sure the results are valid, we measured each variable twice. We think this is a "
+    "good way to get more accurate estimates of the population parameters. " * 4,
+]
+
+
+def load_corpus(paths):
+    """Load documents from .txt files, .jsonl files ({"text": ...}) or directories"""
+    documents = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(os.listdir(path))
+            documents.extend(load_corpus([os.path.join(path, n) for n in names
+                                          if n.endswith(('.txt', '.jsonl'))]))
+        elif path.endswith('.jsonl'):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        documents.append(json.loads(line)['text'])
+        else:
+            with open(path, encoding='utf-8') as f:
+                text = f.read().strip()
+                if text:
+                    documents.append(text)
+    return documents
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, math.ceil(pct / 100.0 * len(values)) - 1))
+    return values[rank]
+
+
+def read_rss_kb(pid):
+    """Resident set size of a process in KiB (Linux /proc only)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def process_tree(pid):
+    """pid and all of its descendants (Linux /proc only)"""
+    pids = [pid]
+    for parent in pids:
+        try:
+            for task in os.listdir(f'/proc/{parent}/task'):
+                with open(f'/proc/{parent}/task/{task}/children') as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def read_tree_rss_kb(pid):
+    """Combined RSS of a process and its children, e.g. sentence worker processes"""
+    values = [read_rss_kb(p) for p in process_tree(pid)]
+    values = [v for v in values if v is not None]
+    return sum(values) if values else None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, timeout=120):
+    """Start app.py without the debug reloader so the PID we hold is the server"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    cmd = [sys.executable, '-m', 'flask', '--app', 'app', 'run',
+           '--host', '127.0.0.1', '--port', str(port), '--no-reload', '--no-debugger']
+    # stderr goes to a file rather than a pipe, so request logging can never block the server
+    log = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, cwd=here, stdout=subprocess.DEVNULL, stderr=log)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'Server exited during startup (code {proc.returncode})\n{_tail(log)}')
+        try:
+            with urllib.request.urlopen(url + '/api/health', timeout=2):
+                return proc, url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.25)
+    proc.terminate()
+    proc.wait()
+    raise RuntimeError(f'Server did not become healthy in time\n{_tail(log)}')
+
+
+def _tail(log, max_bytes=8192):
+    """Last part of the server's stderr, for startup error messages"""
+    log.seek(0, os.SEEK_END)
+    log.seek(max(0, log.tell() - max_bytes))
+    return log.read().decode('utf-8', 'replace')
+
+
+class LoadTest:
+    def __init__(self, url, documents, timeout=300, options=None):
+        self.url = url.rstrip('/') + '/api/humanize'
+        self.documents = documents
+        self.timeout = timeout
+        self.options = options or {}
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.status_counts = {}
+
+    def send(self, text, scheduled=None):
+        """Send one request and record its latency and status
+
+        scheduled is the perf_counter() time the request was due; latency is
+        measured from it so time spent waiting for a free client is included.
+        """
+        payload = dict(self.options, text=text)
+        body = json.dumps(payload).encode('utf-8')
+        req = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        start = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, OSError):
+            status = 'conn-error'
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if status == 200:
+                self.latencies.append(elapsed)
+            else:
+                self.errors += 1
+
+    def run_closed(self, concurrency, duration, rng):
+        """Closed loop: `concurrency` clients each send back-to-back requests"""
+        deadline = time.time() + duration
+
+        def client(client_rng):
+            while time.time() < deadline:
+                self.send(client_rng.choice(self.documents))
+
+        # Each client gets its own seeded stream, so document order does not
+        # depend on thread scheduling
+        rngs = [random.Random(rng.getrandbits(64)) for _ in range(concurrency)]
+        threads = [threading.Thread(target=client, args=(r,), daemon=True) for r in rngs]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def run_open(self, rate, duration, max_in_flight, rng):
+        """Open loop: Poisson arrivals at `rate` req/s regardless of server speed"""
+        deadline = time.perf_counter() + duration
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            next_at = time.perf_counter()
+            while next_at < deadline:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # Latency counts from the scheduled arrival, including any queueing
+                # behind --max-in-flight (avoids coordinated omission)
+                pool.submit(self.send, rng.choice(self.documents), next_at)
+                next_at += rng.expovariate(rate)
+
+    def summary(self, wall_time):
+        latencies = sorted(self.latencies)
+        total = len(latencies) + self.errors
+        return {
+            'requests': total,
+            'ok': len(latencies),
+            'errors': self.errors,
+            'error_rate': (self.errors / total) if total else 0.0,
+            'throughput_rps': len(latencies) / wall_time if wall_time else 0.0,
+            'latency_ms': {
+                'mean': (sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+                'p50': percentile(latencies, 50) * 1000,
+                'p95': percentile(latencies, 95) * 1000,
+                'p99': percentile(latencies, 99) * 1000,
+                'max': (latencies[-1] * 1000) if latencies else 0.0,
+            },
+            'status_counts': {str(k): v for k, v in self.status_counts.items()},
+        }
+
+
+class RSSSampler(threading.Thread):
+    """Samples server RSS (including child processes) at a fixed interval while the test runs"""
+
+    def __init__(self, pid, interval):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        start = time.time()
+        while not self.stop_event.is_set():
+            rss = read_tree_rss_kb(self.pid)
+            if rss is not None:
+                self.samples.append((round(time.time() - start, 2), rss))
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+def print_report(result):
+    lat = result['latency_ms']
+    print(f"Requests:    {result['requests']} ({result['ok']} ok, {result['errors']} errors, "
+          f"{result['error_rate'] * 100:.2f}% error rate)")
+    print(f"Throughput:  {result['throughput_rps']:.2f} req/s over {result['wall_time_s']:.1f}s")
+    print(f"Latency ms:  mean {lat['mean']:.1f}  p50 {lat['p50']:.1f}  p95 {lat['p95']:.1f}  "
+          f"p99 {lat['p99']:.1f}  max {lat['max']:.1f}")
+    rss = result.get('rss_kb')
+    if rss:
+        values = [kb for _, kb in rss]
+        print(f"Server RSS:  start {values[0] / 1024:.1f} MiB  peak {max(values) / 1024:.1f} MiB  "
+              f"end {values[-1] / 1024:.1f} MiB ({len(values)} samples)")
+        for t, kb in rss:
+            print(f"  t={t:>7.2f}s  {kb / 1024:8.1f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the Text Humanizer API')
+    parser.add_argument('--url', help='Target an already running server instead of starting one')
+    parser.add_argument('--pid', type=int, help='Server PID for RSS sampling when --url is used')
+    parser.add_argument('--corpus', nargs='*', default=[], help='.txt/.jsonl files or directories')
+    parser.add_argument('--concurrency', type=int, default=4, help='Closed-loop client count')
+    parser.add_argument('--rate', type=float, help='Open-loop arrival rate in req/s (overrides --concurrency)')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='Open-loop in-flight request cap')
+    parser.add_argument('--duration', type=float, default=30, help='Test length in seconds')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed warm-up requests')
+    parser.add_argument('--rss-interval', type=float, default=1.0, help='RSS sampling interval in seconds')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for corpus selection and arrivals')
+    parser.add_argument('--options', default='{}', help='Extra JSON fields merged into each request body')
+    parser.add_argument('--json', dest='json_out', help='Also write the full report to this file')
+    args = parser.parse_args(argv)
+
+    documents = load_corpus(args.corpus) if args.corpus else DEFAULT_CORPUS
+    if not documents:
+        parser.error('corpus is empty')
+
+    proc = None
+    if args.url:
+        url, pid = args.url, args.pid
+    else:
+        proc, url = start_server(free_port())
+        pid = proc.pid
+
+    try:
+        test = LoadTest(url, documents, options=json.loads(args.options))
+        for i in range(args.warmup):
+            test.send(documents[i % len(documents)])
+        test.latencies, test.errors, test.status_counts = [], 0, {}
+
+        sampler = RSSSampler(pid, args.rss_interval) if pid else None
+        if sampler:
+            sampler.start()
+
+        rng = random.Random(args.seed)
+        start = time.perf_counter()
+        if args.rate:
+            test.run_open(args.rate, args.duration, args.max_in_flight, rng)
+        else:
+            test.run_closed(args.concurrency, args.duration, rng)
+        wall_time = time.perf_counter() - start
+
+        if sampler:
+            sampler.stop()
+
+        result = test.summary(wall_time)
+        result['wall_time_s'] = wall_time
+        result['mode'] = {'rate': args.rate} if args.rate else {'concurrency': args.concurrency}
+        result['documents'] = len(documents)
+        result['rss_kb'] = sampler.samples if sampler else []
+    finally:
+        if proc:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    print_report(result)
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0 if result['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Worker-process pool for the sentence-local stages of TextHumanizer.
+
+Each worker builds its own TextHumanizer once, when the pool starts, and then
+runs batches of per-sentence calls. Results come back in input order, and every
+sentence carries its own seed, so the output does not depend on the number of
+workers or on how sentences are batched.
+
+Every worker has its own single-process executor, and a sentence is always sent
+to the worker picked by a hash of its key (by default the sentence itself).
+The variants of one request, and later requests for the same document, so
+reach the worker that already holds the sentence's analysis in its private
+cache, even without a shared backend.
+
+The first workers use the fork start method where available so they start
+from the already-imported application, before the server has started any
+threads. Replacements for a worker that died are spawned instead, since by
+then the server is multi-threaded and forking it could copy a held lock into
+the child. Worker processes are named so in_worker() can tell them apart from
+other child processes, such as the server processes of a multi-process ASGI
+or WSGI server. If a worker dies, it is replaced and the caller falls back to
+running the batch in-process.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from nltk.corpus import wordnet
+
+import caching
+import prefetch
+
+WORKERS = int(os.environ.get('HUMANIZE_WORKERS', '0'))
+MIN_SENTENCES = int(os.environ.get('HUMANIZE_PARALLEL_MIN_SENTENCES', '24'))
+BATCH_SIZE = int(os.environ.get('HUMANIZE_PARALLEL_BATCH', '8'))
+
+WORKER_NAME = 'humanize-sentence-worker'
+
+log = logging.getLogger(__name__)
+
+_worker_humanizer = None
+_worker_warmer = None
+
+
+def in_worker():
+    """Whether this process is a sentence worker (set before a spawned worker imports anything)"""
+    return multiprocessing.current_process().name.startswith(WORKER_NAME)
+
+
+class _WorkerContext:
+    """Multiprocessing context whose processes carry the worker name"""
+
+    def __init__(self, method):
+        self.context = multiprocessing.get_context(method)
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+    def Process(self, *args, **kwargs):
+        process = self.context.Process(*args, **kwargs)
+        process.name = f'{WORKER_NAME}-{process.name}'
+        return process
+
+
+def _init_worker(factory):
+    global _worker_humanizer, _worker_warmer
+    _worker_humanizer = factory()
+    try:
+        # Load WordNet now rather than during the first request
+        wordnet.ensure_loaded()
+    except LookupError:
+        pass
+    # Without a shared backend the parent's warmed cache is invisible here,
+    # so each worker warms its own between batches
+    _worker_warmer = prefetch.VocabularyWarmer(_worker_humanizer)
+    if (prefetch.PREFETCH_ENABLED and prefetch.PREFETCH_WORDLIST
+            and not isinstance(_worker_humanizer.cache, caching.TieredCache)):
+        _worker_warmer.load_wordlist(prefetch.PREFETCH_WORDLIST)
+        _worker_warmer.start()
+
+
+def _ready():
+    return os.getpid()
+
+
+def _run_batch(method, batch):
+    func = getattr(_worker_humanizer, method)
+    with _worker_warmer.busy():
+        return [func(*args) for args in batch]
+
+
+class SentencePool:
+    def __init__(self, workers, factory, min_sentences=MIN_SENTENCES, batch_size=BATCH_SIZE):
+        self.workers = workers
+        self.min_sentences = min_sentences
+        self.batch_size = batch_size
+        self.factory = factory
+        self.lock = threading.Lock()
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+        self.executors = [self._start(method) for _ in range(workers)]
+        # Wait for every worker now so no request pays for process start-up
+        for executor in self.executors:
+            executor.submit(_ready).result()
+
+    def _start(self, method):
+        return ProcessPoolExecutor(1, mp_context=_WorkerContext(method),
+                                   initializer=_init_worker, initargs=(self.factory,))
+
+    def _replace(self, index, broken):
+        with self.lock:
+            if self.executors[index] is broken:
+                log.warning('Sentence worker %d died; spawning a new one', index)
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.executors[index] = self._start('spawn')
+
+    def should_fan_out(self, count):
+        return count >= self.min_sentences
+
+    def worker_for(self, key):
+        """Index of the worker that handles every call with this key"""
+        return zlib.crc32(key.encode('utf-8')) % self.workers
+
+    def map(self, method, calls, keys=None):
+        """Run humanizer.<method>(*args) for every args tuple, preserving order
+
+        Call i goes to the worker for keys[i] (default: its first argument), in
+        batches of at most batch_size calls. Raises BrokenProcessPool if a worker
+        died; that worker is replaced first, so later calls work again.
+        """
+        if keys is None:
+            keys = [args[0] for args in calls]
+        assigned = [[] for _ in range(self.workers)]
+        for i, key in enumerate(keys):
+            assigned[self.worker_for(key)].append(i)
+
+        executors = list(self.executors)
+        jobs = []
+        broken = None
+        for index, positions in enumerate(assigned):
+            try:
+                for start in range(0, len(positions), self.batch_size):
+                    batch = positions[start:start + self.batch_size]
+                    future = executors[index].submit(_run_batch, method, [calls[i] for i in batch])
+                    jobs.append((index, batch, future))
+            except BrokenProcessPool as e:
+                # The worker died after the previous call returned
+                self._replace(index, executors[index])
+                broken = broken or e
+
+        results = [None] * len(calls)
+        for index, batch, future in jobs:
+            try:
+                for i, result in zip(batch, future.result()):
+                    results[i] = result
+            except BrokenProcessPool as e:
+                self._replace(index, executors[index])
+                broken = broken or e
+        if broken is not None:
+            raise broken
+        return results
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown()
@@ -0,0 +1,125 @@
+"""
+Background vocabulary prefetch.
+
+VocabularyWarmer fills the humanizer's synonym and meaning-validation caches
+ahead of time from an academic word list (HUMANIZE_PREFETCH_WORDLIST). It
+runs in a low-priority daemon thread and only works while no request is in
+flight: live requests mark themselves with busy(), and the warmer checks
+between words and steps aside as soon as one arrives.
+
+Submitted documents are not warmed: a request has already cached its own
+vocabulary by the time the warmer could get to it. Worker processes have
+private caches unless a shared backend is configured, so parallel.py gives
+each worker its own warmer in that case.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+PREFETCH_ENABLED = os.environ.get('HUMANIZE_PREFETCH', '1') != '0'
+PREFETCH_WORDLIST = os.environ.get('HUMANIZE_PREFETCH_WORDLIST', '')
+
+# Tags used to warm words from the word list, one per WordNet part of speech
+WORDLIST_TAGS = ('NN', 'VB', 'JJ', 'RB')
+
+
+class VocabularyWarmer(threading.Thread):
+    def __init__(self, humanizer, max_pending=50000, max_warmed=500000, idle_delay=0.05):
+        super().__init__(daemon=True, name='vocabulary-warmer')
+        self.humanizer = humanizer
+        self.max_pending = max_pending
+        self.max_warmed = max_warmed
+        self.idle_delay = idle_delay
+        self.condition = threading.Condition()
+        self.active_requests = 0
+        self.idle = threading.Event()
+        self.idle.set()
+        self.pending = OrderedDict()
+        self.warmed = OrderedDict()
+
+    @contextmanager
+    def busy(self):
+        """Mark a live request; the warmer pauses until all of them finish"""
+        with self.condition:
+            self.active_requests += 1
+            self.idle.clear()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active_requests -= 1
+                if self.active_requests == 0:
+                    self.idle.set()
+                    self.condition.notify()
+
+    def submit_words(self, words, tags=WORDLIST_TAGS):
+        """Queue words to be warmed for each of the given tags"""
+        with self.condition:
+            for word in words:
+                for tag in tags:
+                    self._queue(word, tag)
+            self.condition.notify()
+
+    def load_wordlist(self, path):
+        """Queue every word of a file with one word per line ('#' starts a comment)"""
+        with open(path, encoding='utf-8') as f:
+            words = [line.split('#', 1)[0].strip() for line in f]
+        self.submit_words(w for w in words if w)
+
+    def _queue(self, word, tag):
+        key = (word.lower(), tag[:1])
+        if key in self.warmed or key in self.pending or len(self.pending) >= self.max_pending:
+            return
+        self.pending[key] = (word, tag)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'pending_words': len(self.pending),
+                'warmed_words': len(self.warmed),
+                'active_requests': self.active_requests,
+            }
+
+    def run(self):
+        try:
+            # Best effort: lower this thread's CPU priority (Linux threads have their own nice value)
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            with self.condition:
+                while not self.pending or self.active_requests:
+                    self.condition.wait()
+            # Give a burst of requests a moment to arrive before competing for the GIL
+            if not self._wait_idle():
+                continue
+            self._work()
+
+    def _wait_idle(self):
+        self.idle.wait()
+        time.sleep(self.idle_delay)
+        return self.idle.is_set()
+
+    def _interrupted(self):
+        return not self.idle.is_set()
+
+    def _work(self):
+        while not self._interrupted():
+            with self.condition:
+                if not self.pending:
+                    return
+                item = self.pending.popitem(last=False)
+            self._warm(*item)
+
+    def _warm(self, key, item):
+        word, tag = item
+        try:
+            self.humanizer.warm_word(word, tag)
+        except Exception:
+            pass
+        with self.condition:
+            self.warmed[key] = True
+            while len(self.warmed) > self.max_warmed:
+                self.warmed.popitem(last=False)
@@ -0,0 +1,198 @@
+"""
+On-demand profiling for single /api/humanize requests.
+
+A request opts in by sending the profiling token (HUMANIZE_PROFILE_TOKEN) in
+the X-Profile-Token header or the ?profile= query parameter. That one request
+is run under a stack sampler with tracemalloc enabled, and the resulting
+profile (collapsed stacks, WordNet call counts, per-stage timings and
+allocations) is kept in memory for download from the admin endpoints.
+
+When no profile is active the only cost on the hot path is a ContextVar
+lookup per pipeline stage and per WordNet call.
+"""
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+PROFILE_TOKEN = os.environ.get('HUMANIZE_PROFILE_TOKEN', '')
+SAMPLE_INTERVAL = float(os.environ.get('HUMANIZE_PROFILE_INTERVAL', '0.002'))
+MAX_STORED_PROFILES = int(os.environ.get('HUMANIZE_PROFILE_KEEP', '20'))
+
+_active_profile = contextvars.ContextVar('humanize_profile', default=None)
+
+# tracemalloc is process-wide: it stays on while any profiled request runs
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def current_profile():
+    """Return the profile attached to the running request, or None"""
+    return _active_profile.get()
+
+
+def is_enabled():
+    return bool(PROFILE_TOKEN)
+
+
+def is_authorized(token):
+    """Check a caller-supplied token; always False while profiling is disabled"""
+    if not PROFILE_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), PROFILE_TOKEN.encode('utf-8'))
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    """Stop tracemalloc once the last profiled request is done, if we started it"""
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Periodically samples the call stack of one thread"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True, name='humanize-profiler')
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class RequestProfile:
+    def __init__(self, text_length):
+        self.id = uuid.uuid4().hex[:12]
+        self.created = time.time()
+        self.text_length = text_length
+        self.duration = 0.0
+        self.stacks = Counter()
+        self.samples = 0
+        self.wordnet_calls = Counter()
+        self.stages = []
+
+    def count(self, name):
+        self.wordnet_calls[name] += 1
+
+    @contextmanager
+    def stage(self, name):
+        """Record wall time and traced allocations for one pipeline stage"""
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = {'stage': name, 'seconds': time.perf_counter() - start}
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                entry['net_alloc_bytes'] = current - before
+                entry['peak_alloc_bytes'] = max(0, peak - before)
+            self.stages.append(entry)
+
+    def collapsed(self):
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'created': self.created,
+            'text_length': self.text_length,
+            'duration_seconds': self.duration,
+            'samples': self.samples,
+            'wordnet_calls': dict(self.wordnet_calls),
+            'stages': self.stages,
+        }
+
+
+class ProfileStore:
+    """Bounded in-memory store of finished profiles, newest last"""
+
+    def __init__(self, max_items=MAX_STORED_PROFILES):
+        self.max_items = max_items
+        self.lock = threading.Lock()
+        self.profiles = OrderedDict()
+
+    def add(self, profile):
+        with self.lock:
+            self.profiles[profile.id] = profile
+            while len(self.profiles) > self.max_items:
+                self.profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        with self.lock:
+            return self.profiles.get(profile_id)
+
+    def list(self):
+        with self.lock:
+            return [p.summary() for p in reversed(self.profiles.values())]
+
+
+def run_profiled(func, text, *args, **kwargs):
+    """Run func(text, ...) under the sampler and return (result, profile).
+
+    tracemalloc is process-wide, so allocations made by concurrent requests
+    during the profiled one are included in its stage totals. Overlapping
+    profiled requests share one tracing session, which stops when the last
+    of them finishes.
+    """
+    profile = RequestProfile(len(text))
+    _start_tracing()
+    sampler = StackSampler(threading.get_ident(), SAMPLE_INTERVAL)
+    token = _active_profile.set(profile)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        result = func(text, *args, **kwargs)
+    finally:
+        profile.duration = time.perf_counter() - start
+        sampler.stop()
+        _active_profile.reset(token)
+        _stop_tracing()
+        profile.stacks = sampler.stacks
+        profile.samples = sampler.samples
+    return result, profile
@@ -0,0 +1,59 @@
+"""
+Single-flight deduplication of identical in-flight work.
+
+Concurrent callers that ask for the same key while a computation for that key
+is running wait for it and receive its result (or its exception) instead of
+starting their own. Nothing is kept once the computation finishes, so this is
+not a result cache.
+"""
+import hashlib
+import json
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """Run func(*args, **kwargs) unless a call with the same key is in flight"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
+
+
+def request_key(*parts):
+    """Stable digest of JSON-serializable request parts"""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
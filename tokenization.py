@@ -0,0 +1,213 @@
+"""
+Fast regex sentence splitter and word tokenizer.
+
+Drop-in replacements for NLTK's sent_tokenize (Punkt) and word_tokenize
+(Treebank) tuned for academic text. Sentence splitting knows the common
+research abbreviations ("et al.", "e.g.", "Fig.", ...). Word tokenization
+applies the Treebank rules chunk by chunk: plain words, which make up most
+of a sentence, are matched by one precompiled regex and only chunks that
+contain punctuation go through the full rule cascade.
+
+Run tokenizer_parity.py to compare the output with NLTK on a corpus.
+"""
+import re
+
+# Abbreviations that never end a sentence (lowercase, without the final period)
+ABBREVIATIONS = {
+    'e.g', 'i.e', 'cf', 'viz', 'vs', 'ca', 'approx', 'resp', 'fig', 'figs',
+    'eq', 'eqs', 'eqn', 'eqns', 'ref', 'refs', 'tab', 'sec', 'sect', 'ch', 'chap',
+    'vol', 'vols', 'no', 'nos', 'pp', 'p', 'ed', 'eds', 'dept', 'univ', 'inst',
+    'dr', 'mr', 'mrs', 'ms', 'prof', 'jr', 'sr', 'st', 'inc', 'ltd', 'co', 'corp',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+    'u.s', 'u.k', 'ph.d', 'm.sc', 'b.sc',
+}
+
+# Abbreviations that end a sentence when the next word is capitalized
+SENTENCE_FINAL_ABBREVIATIONS = {'etc', 'al'}
+
+# Capitalized words that start a sentence rather than follow an initial, so
+# "vitamin C. The ..." and "condition A. Results ..." split but "J. Smith" does not
+SENTENCE_STARTERS = {
+    'a', 'after', 'all', 'also', 'although', 'an', 'as', 'at', 'based', 'because', 'before',
+    'both', 'but', 'by', 'data', 'each', 'finally', 'first', 'for', 'from', 'further',
+    'furthermore', 'here', 'however', 'i', 'if', 'in', 'it', 'its', 'many', 'moreover',
+    'most', 'no', 'nevertheless', 'not', 'on', 'one', 'our', 'overall', 'participants',
+    'results', 'second', 'several', 'similarly', 'since', 'so', 'some', 'such', 'table',
+    'that', 'the', 'their', 'then', 'there', 'therefore', 'these', 'they', 'this', 'those',
+    'thus', 'to', 'using', 'we', 'when', 'where', 'while', 'with', 'yet',
+}
+
+_BOUNDARY_RE = re.compile(r'([.?!]+)([\'"”’)\]}]*)\s+(?=(\S))')
+# Closing quotes/brackets; a leading " or '' would become an opening quote
+_CLOSERS_RE = re.compile(r'(?!"|\'\')[\]\)}>"\'»”’]+')
+
+# Treebank rules, in the order NLTKWordTokenizer applies them
+_STARTING_QUOTES = [
+    (re.compile('([«“‘„]|[`]+)'), r' \1 '),
+    (re.compile(r'^\"'), r'``'),
+    (re.compile(r'(``)'), r' \1 '),
+    (re.compile(r'([ \(\[{<])(\"|\'{2})'), r'\1 `` '),
+    (re.compile(r"(?i)(\')(?!re|ve|ll|m|t|s|d|n)(\w)\b"), r'\1 \2'),
+]
+
+# The third field marks the final-period rules, which only apply at the end
+# of a sentence
+_PUNCTUATION = [
+    (re.compile(r'([^\.])(\.)([\]\)}>"\'' '»”’ ' r']*)\s*$'), r'\1 \2 \3 ', True),
+    (re.compile(r'([:,])([^\d])'), r' \1 \2', False),
+    (re.compile(r'([:,])$'), r' \1 ', False),
+    (re.compile(r'\.{2,}'), r' \g<0> ', False),
+    (re.compile(r'[;@#$%&]'), r' \g<0> ', False),
+    (re.compile(r'([^\.])(\.)([\]\)}>"\']*)\s*$'), r'\1 \2\3 ', True),
+    (re.compile(r'[?!]'), r' \g<0> ', False),
+    (re.compile(r"([^'])' "), r"\1 ' ", False),
+    (re.compile(r'[*]'), r' \g<0> ', False),
+]
+
+_PARENS_BRACKETS = (re.compile(r'[\]\[\(\)\{\}\<\>]'), r' \g<0> ')
+_DOUBLE_DASHES = (re.compile(r'--'), r' -- ')
+
+_ENDING_QUOTES = [
+    (re.compile('([»”’])'), r' \1 '),
+    (re.compile(r"''"), " '' "),
+    (re.compile(r'"'), " '' "),
+    (re.compile(r"([^' ])('[sS]|'[mM]|'[dD]|') "), r'\1 \2 '),
+    (re.compile(r"([^' ])('ll|'LL|'re|'RE|'ve|'VE|n't|N'T) "), r'\1 \2 '),
+]
+
+_CONTRACTIONS = [re.compile(p) for p in (
+    r'(?i)\b(can)(?#X)(not)\b',
+    r"(?i)\b(d)(?#X)('ye)\b",
+    r'(?i)\b(gim)(?#X)(me)\b',
+    r'(?i)\b(gon)(?#X)(na)\b',
+    r'(?i)\b(got)(?#X)(ta)\b',
+    r'(?i)\b(lem)(?#X)(me)\b',
+    r"(?i)\b(more)(?#X)('n)\b",
+    r'(?i)\b(wan)(?#X)(na)(?=\s)',
+    r"(?i) ('t)(?#X)(is)\b",
+    r"(?i) ('t)(?#X)(was)\b",
+)]
+
+# A plain word, internal hyphens and periods allowed. Hyphens and periods are
+# word boundaries for the contraction rules, so no part may be a contraction
+# such as "cannot" (as in "cannot." or "U.S.cannot").
+_PLAIN_PART = r'(?!(?i:cannot|gimme|gonna|gotta|lemme|wanna)\b)[^\W_]+'
+_PLAIN_WORD = _PLAIN_PART + r'(?:[-.]' + _PLAIN_PART + r')*'
+
+# A run of chunks whose Treebank tokens can be read straight off the text: a
+# plain word with simple brackets and punctuation around it. Most of a
+# sentence is such a run.
+_FAST_RUN_RE = re.compile(r'(?:\(?' + _PLAIN_WORD + r'\.?\)?[,;:]?(?:\s+|$))*')
+_FAST_TOKEN_RE = re.compile(r'[^\W_]+(?:[-.][^\W_]+)*\.?|[(),;:]')
+
+# Single chunks of the same shape; anything else goes through the cascade
+_FAST_CHUNK_RE = re.compile(r'(\(?)(' + _PLAIN_WORD + r'\.?)(\)?)([,;:]?)')
+_FAST_FINAL_RE = re.compile(r'(\(?)(' + _PLAIN_WORD + r')(\)?)([.?!]?)(\)?)')
+
+
+def sent_tokenize(text):
+    """Split text into sentences, keeping abbreviations and initials intact"""
+    sentences = []
+    start = 0
+    for match in _BOUNDARY_RE.finditer(text):
+        if _is_boundary(text, match):
+            sentence = text[start:match.end(2)].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _is_boundary(text, match):
+    marks = match.group(1)
+    next_char = match.group(3)
+    if marks[-1] in '?!':
+        return True
+    if len(marks) > 1:
+        # Ellipsis only ends a sentence before a capitalized word
+        return next_char.isupper()
+    before = text[max(0, match.start() - 40):match.start()].split()
+    if not before:
+        return True
+    word = before[-1].lstrip('(["\'“‘').lower()
+    if word in SENTENCE_FINAL_ABBREVIATIONS:
+        return next_char.isupper()
+    if word in ABBREVIATIONS:
+        return False
+    # Single-letter initials such as "J. Smith", unless a sentence clearly starts next
+    if len(word) == 1 and word.isalpha():
+        following = text[match.end():].split(None, 1)[0].strip('(["\'“‘.,;:')
+        return following[:1].isupper() and following.lower() in SENTENCE_STARTERS
+    return True
+
+
+def _treebank(text, final):
+    """Apply the Treebank rule cascade to a fragment of one sentence"""
+    for regexp, substitution in _STARTING_QUOTES:
+        text = regexp.sub(substitution, text)
+    for regexp, substitution, final_only in _PUNCTUATION:
+        if final or not final_only:
+            text = regexp.sub(substitution, text)
+    regexp, substitution = _PARENS_BRACKETS
+    text = regexp.sub(substitution, text)
+    regexp, substitution = _DOUBLE_DASHES
+    text = regexp.sub(substitution, text)
+    text = ' ' + text + ' '
+    for regexp, substitution in _ENDING_QUOTES:
+        text = regexp.sub(substitution, text)
+    for regexp in _CONTRACTIONS:
+        text = regexp.sub(r' \1 \2 ', text)
+    return text.split()
+
+
+def _split_final_period(tokens):
+    i = len(tokens) - 1
+    while i > 0 and tokens[i] == ')':
+        i -= 1
+    token = tokens[i]
+    if len(token) > 1 and token[-1] == '.':
+        tokens[i:i + 1] = [token[:-1], '.']
+
+
+def _tokenize_sentence(sentence):
+    run_end = _FAST_RUN_RE.match(sentence).end()
+    tokens = _FAST_TOKEN_RE.findall(sentence, 0, run_end)
+    chunks = sentence[run_end:].split()
+    if not chunks:
+        if tokens:
+            _split_final_period(tokens)
+        return tokens
+    # The final period rule also looks past trailing closing quotes/brackets
+    last = len(chunks) - 1
+    while last > 0 and _CLOSERS_RE.fullmatch(chunks[last]):
+        last -= 1
+    if last == 0 and tokens and _CLOSERS_RE.fullmatch(chunks[0]):
+        _split_final_period(tokens)
+    for i in range(last):
+        chunk = chunks[i]
+        match = _FAST_CHUNK_RE.fullmatch(chunk)
+        if match:
+            tokens.extend(token for token in match.groups() if token)
+        else:
+            # Leading space stands in for the preceding chunk, which the
+            # opening-quote rule inspects
+            tokens.extend(_treebank((' ' if tokens else '') + chunk + ' ', False))
+    tail = ' '.join(chunks[last:])
+    match = _FAST_FINAL_RE.fullmatch(tail) if last == len(chunks) - 1 else None
+    if match:
+        tokens.extend(token for token in match.groups() if token)
+    else:
+        tokens.extend(_treebank((' ' if tokens else '') + tail, True))
+    return tokens
+
+
+def word_tokenize(text, preserve_line=False):
+    """Treebank-style word tokens for every sentence of text"""
+    sentences = [text] if preserve_line else sent_tokenize(text)
+    tokens = []
+    for sentence in sentences:
+        tokens.extend(_tokenize_sentence(sentence))
+    return tokens
@@ -0,0 +1,125 @@
+"""
+Parity and speed check for the fast tokenizers in tokenization.py.
+
+Compares tokenization.sent_tokenize / word_tokenize with NLTK's Punkt and
+Treebank tokenizers on a research corpus plus a set of tricky academic
+sentences, prints every disagreement and the speed-up, and exits non-zero
+when agreement falls below the thresholds.
+
+Examples:
+    python tokenizer_parity.py
+    python tokenizer_parity.py --corpus papers/ --min-sentence-agreement 0.97
+"""
+import argparse
+import sys
+import time
+
+from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+from nltk.tokenize import NLTKWordTokenizer
+
+import tokenization
+from loadtest import DEFAULT_CORPUS, load_corpus
+
+# Academic constructs the fast path must tokenize exactly like Treebank
+WORD_CASES = [
+    'Good muffins cost $3.88 (roughly 3,36 euros) in New York.',
+    'As shown in Fig. 3, the model (see Eq. 2) outperforms baselines, e.g., BERT [12].',
+    'Smith et al. (2019) reported p < 0.05 -- a 12.5% gain... really?',
+    "We don't know why the students' scores can't improve; we cannot say.",
+    '"Hello," she said, "it\'s fine."',
+    "The 'model' was trained on 1,000,000 samples: results were good!",
+    "It's a U.S.-based study, i.e. domestic, at 10:30 a.m.",
+    'Participants (n = 42) completed the task [see Table 1].',
+    'The well-known *starred* term & #tag @user at 50% off.',
+    '«Quoted» and “curly” text’s here.',
+    'The result is ``interesting\'\' indeed.',
+    '(This sentence is parenthetical.)',
+    'He said "yes."',
+    'Results are summarized in Sect. 4.2.',
+    'We cannot. The model is gonna fail.',
+    'The U.S.cannot and x-gonna forms split like Treebank.',
+    'Cannot. gotta.x wanna. are rare but valid chunks.',
+]
+
+# Text whose sentence boundaries depend on abbreviation handling
+SENTENCE_CASES = [
+    'As shown in Fig. 3, the model converges. Smith et al. (2019) observed the same effect.',
+    'Several baselines, e.g. BERT and GPT, were evaluated. All of them underperformed.',
+    'The samples were analyzed by J. Smith and M. Jones. Results are reported in Sect. 4.',
+    'Is the effect robust? We believe so! Further tests follow in Eq. 5 and Tab. 2.',
+    'Prior work (cf. Brown et al.) used smaller corpora. We extend it to 1.5 million documents.',
+    'Participants received vitamin C. The control group did not.',
+    'We compare condition A. Results follow.',
+    'The protocol of J. R. Smith was used. It is described in Sect. 2.',
+]
+
+
+def compare(documents, show):
+    nltk_words = NLTKWordTokenizer()
+    sent_total = sent_match = 0
+    word_total = word_match = 0
+    for doc in documents:
+        expected = nltk_sent_tokenize(doc)
+        actual = tokenization.sent_tokenize(doc)
+        sent_total += 1
+        if expected == actual:
+            sent_match += 1
+        elif show:
+            print('SENTENCES DIFFER')
+            print('  nltk:', expected)
+            print('  fast:', actual)
+        # Words are compared per NLTK sentence so boundary differences do not cascade
+        for sentence in expected:
+            expected_words = nltk_words.tokenize(sentence)
+            actual_words = tokenization.word_tokenize(sentence, preserve_line=True)
+            word_total += 1
+            if expected_words == actual_words:
+                word_match += 1
+            elif show:
+                print('WORDS DIFFER:', sentence)
+                print('  nltk:', expected_words)
+                print('  fast:', actual_words)
+    return sent_match / sent_total, word_match / word_total
+
+
+def timeit(func, documents, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for doc in documents:
+            for sentence in func[0](doc):
+                func[1](sentence)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare fast tokenizers with NLTK Punkt/Treebank')
+    parser.add_argument('--corpus', nargs='*', default=[], help='.txt/.jsonl files or directories')
+    parser.add_argument('--min-sentence-agreement', type=float, default=0.95,
+                        help='Fraction of documents that must split into identical sentences')
+    parser.add_argument('--min-word-agreement', type=float, default=0.99,
+                        help='Fraction of sentences that must produce identical word tokens')
+    parser.add_argument('--repeat', type=int, default=20, help='Timing repetitions')
+    parser.add_argument('--quiet', action='store_true', help='Do not print individual differences')
+    args = parser.parse_args(argv)
+
+    documents = load_corpus(args.corpus) if args.corpus else DEFAULT_CORPUS
+    documents = documents + SENTENCE_CASES + WORD_CASES
+
+    sent_agreement, word_agreement = compare(documents, not args.quiet)
+
+    nltk_words = NLTKWordTokenizer()
+    nltk_time = timeit((nltk_sent_tokenize, nltk_words.tokenize), documents, args.repeat)
+    fast_time = timeit((tokenization.sent_tokenize,
+                        lambda s: tokenization.word_tokenize(s, preserve_line=True)),
+                       documents, args.repeat)
+
+    print(f'Sentence agreement: {sent_agreement * 100:.2f}% of {len(documents)} documents')
+    print(f'Word agreement:     {word_agreement * 100:.2f}% of sentences')
+    print(f'NLTK: {nltk_time:.3f}s  fast: {fast_time:.3f}s  speed-up: {nltk_time / fast_time:.1f}x')
+
+    ok = sent_agreement >= args.min_sentence_agreement and word_agreement >= args.min_word_agreement
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())